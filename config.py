@@ -1,72 +1,90 @@
 import os
+from dataclasses import dataclass, field
+from typing import Optional
 
-# ============================================================================
-# LLM Configuration
-# ============================================================================
 
-# API Key
-OPENAI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("OPENAI_API_KEY")
+def _api_key_from_env() -> Optional[str]:
+    return os.getenv("GEMINI_API_KEY") or os.getenv("OPENAI_API_KEY")
 
-# LLM Model (Updated to gemini-2.5-flash based on availability)
-LLM_MODEL = "gemini/gemini-2.5-flash"
 
-# Embedding model
-EMBEDDING_MODEL = "gemini/text-embedding-004"
-EMBEDDING_DIMENSION = 768
-EMBEDDING_CONTEXT_LENGTH = 8192
+@dataclass(frozen=True, slots=True)
+class _Cfg:
+    # ========================================================================
+    # LLM Configuration
+    # ========================================================================
 
-OPENAI_BASE_URL = None
+    # API Key
+    OPENAI_API_KEY: Optional[str] = field(default_factory=_api_key_from_env)
 
-# ============================================================================
-# Advanced LLM Features
-# ============================================================================
+    # LLM Model (Updated to gemini-2.5-flash based on availability)
+    LLM_MODEL: str = "gemini/gemini-2.5-flash"
 
-ENABLE_THINKING = False
-USE_STREAMING = True
-USE_JSON_FORMAT = True 
+    # Embedding model
+    EMBEDDING_MODEL: str = "gemini/text-embedding-004"
+    EMBEDDING_DIMENSION: int = 768
+    EMBEDDING_CONTEXT_LENGTH: int = 8192
+    EMBEDDING_BATCH_SIZE: int = 64  # Texts per embedding request; sub-batches run concurrently
+    EMBEDDING_MAX_BATCH_TOKENS: int = 200000  # Token budget per embedding request
+    ENABLE_EMBEDDING_CACHE: bool = True  # Reuse embeddings stored in <db path>/embed_cache (LANCEDB_PATH by default)
+    EMBEDDING_OUT_DIM: Optional[int] = None  # Matryoshka truncation width (None = native); changing it requires a re-index
 
-# ============================================================================
-# Memory Building Parameters
-# ============================================================================
+    OPENAI_BASE_URL: Optional[str] = None
 
-WINDOW_SIZE = 40
-OVERLAP_SIZE = 2
+    # ========================================================================
+    # Advanced LLM Features
+    # ========================================================================
 
-# ============================================================================
-# Retrieval Parameters
-# ============================================================================
+    ENABLE_THINKING: bool = False
+    USE_STREAMING: bool = True
+    USE_JSON_FORMAT: bool = True
 
-SEMANTIC_TOP_K = 10
-KEYWORD_TOP_K = 5
-STRUCTURED_TOP_K = 5
+    # ========================================================================
+    # Memory Building Parameters
+    # ========================================================================
 
-# ============================================================================
-# Database Configuration
-# ============================================================================
+    WINDOW_SIZE: int = 40
+    OVERLAP_SIZE: int = 2
 
-# Use absolute path to ensure database is found regardless of where script is run
-LANCEDB_PATH = "/Users/nicodem/Downloads/SimpleMem/lancedb_data"
-MEMORY_TABLE_NAME = "memory_entries"
+    # ========================================================================
+    # Retrieval Parameters
+    # ========================================================================
 
-# ============================================================================
-# Parallel Processing Configuration
-# ============================================================================
+    SEMANTIC_TOP_K: int = 10
+    KEYWORD_TOP_K: int = 5
+    STRUCTURED_TOP_K: int = 5
 
-ENABLE_PARALLEL_PROCESSING = False
-MAX_PARALLEL_WORKERS = 4
-ENABLE_PARALLEL_RETRIEVAL = False
-MAX_RETRIEVAL_WORKERS = 4
-ENABLE_PLANNING = True
-ENABLE_REFLECTION = True
-MAX_REFLECTION_ROUNDS = 2
+    # ========================================================================
+    # Database Configuration
+    # ========================================================================
 
-# ============================================================================
-# Judge Configuration
-# ============================================================================
+    # Use absolute path to ensure database is found regardless of where script is run
+    LANCEDB_PATH: str = "/Users/nicodem/Downloads/SimpleMem/lancedb_data"
+    MEMORY_TABLE_NAME: str = "memory_entries"
 
-JUDGE_API_KEY = OPENAI_API_KEY
-JUDGE_MODEL = LLM_MODEL
-JUDGE_BASE_URL = None
-JUDGE_ENABLE_THINKING = False
-JUDGE_USE_STREAMING = False
-JUDGE_TEMPERATURE = 0.3
+    # ========================================================================
+    # Parallel Processing Configuration
+    # ========================================================================
+
+    ENABLE_PARALLEL_PROCESSING: bool = False
+    MAX_PARALLEL_WORKERS: int = 4
+    ENABLE_PARALLEL_RETRIEVAL: bool = False
+    MAX_RETRIEVAL_WORKERS: int = 4
+    ENABLE_PLANNING: bool = True
+    ENABLE_REFLECTION: bool = True
+    MAX_REFLECTION_ROUNDS: int = 2
+
+    # ========================================================================
+    # Judge Configuration
+    # ========================================================================
+
+    # None = follow OPENAI_API_KEY / LLM_MODEL
+    JUDGE_API_KEY: Optional[str] = None
+    JUDGE_MODEL: Optional[str] = None
+    JUDGE_BASE_URL: Optional[str] = None
+    JUDGE_ENABLE_THINKING: bool = False
+    JUDGE_USE_STREAMING: bool = False
+    JUDGE_TEMPERATURE: float = 0.3
+
+
+# Read-only settings singleton; consumers use `from config import CFG`
+CFG = _Cfg()
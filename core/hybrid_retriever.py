@@ -12,7 +12,7 @@ from typing import List, Optional, Dict, Any
 from models.memory_entry import MemoryEntry
 from utils.llm_client import LLMClient
 from database.vector_store import VectorStore
-import config
+from config import CFG
 import re
 from datetime import datetime, timedelta
 import dateparser
@@ -49,16 +49,16 @@ class HybridRetriever:
     ):
         self.llm_client = llm_client
         self.vector_store = vector_store
-        self.semantic_top_k = semantic_top_k or config.SEMANTIC_TOP_K
-        self.keyword_top_k = keyword_top_k or config.KEYWORD_TOP_K
-        self.structured_top_k = structured_top_k or config.STRUCTURED_TOP_K
+        self.semantic_top_k = semantic_top_k or CFG.SEMANTIC_TOP_K
+        self.keyword_top_k = keyword_top_k or CFG.KEYWORD_TOP_K
+        self.structured_top_k = structured_top_k or CFG.STRUCTURED_TOP_K
         
         # Use config values as default if not explicitly provided
-        self.enable_planning = enable_planning if enable_planning is not None else getattr(config, 'ENABLE_PLANNING', True)
-        self.enable_reflection = enable_reflection if enable_reflection is not None else getattr(config, 'ENABLE_REFLECTION', True)
-        self.max_reflection_rounds = max_reflection_rounds if max_reflection_rounds is not None else getattr(config, 'MAX_REFLECTION_ROUNDS', 2)
-        self.enable_parallel_retrieval = enable_parallel_retrieval if enable_parallel_retrieval is not None else getattr(config, 'ENABLE_PARALLEL_RETRIEVAL', True)
-        self.max_retrieval_workers = max_retrieval_workers if max_retrieval_workers is not None else getattr(config, 'MAX_RETRIEVAL_WORKERS', 3)
+        self.enable_planning = enable_planning if enable_planning is not None else CFG.ENABLE_PLANNING
+        self.enable_reflection = enable_reflection if enable_reflection is not None else CFG.ENABLE_REFLECTION
+        self.max_reflection_rounds = max_reflection_rounds if max_reflection_rounds is not None else CFG.MAX_REFLECTION_ROUNDS
+        self.enable_parallel_retrieval = enable_parallel_retrieval if enable_parallel_retrieval is not None else CFG.ENABLE_PARALLEL_RETRIEVAL
+        self.max_retrieval_workers = max_retrieval_workers if max_retrieval_workers is not None else CFG.MAX_RETRIEVAL_WORKERS
 
     def retrieve(self, query: str, enable_reflection: Optional[bool] = None) -> List[MemoryEntry]:
         """
@@ -206,7 +206,7 @@ Return ONLY JSON, no other content.
             try:
                 # Use JSON format if configured
                 response_format = None
-                if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+                if CFG.USE_JSON_FORMAT:
                     response_format = {"type": "json_object"}
 
                 response = self.llm_client.chat_completion(
@@ -381,7 +381,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -464,7 +464,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -525,7 +525,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -694,7 +694,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -765,7 +765,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -885,7 +885,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
@@ -950,7 +950,7 @@ Return ONLY the JSON, no other text.
         try:
             # Use JSON format if configured
             response_format = None
-            if hasattr(config, 'USE_JSON_FORMAT') and config.USE_JSON_FORMAT:
+            if CFG.USE_JSON_FORMAT:
                 response_format = {"type": "json_object"}
                 
             response = self.llm_client.chat_completion(
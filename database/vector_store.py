@@ -13,7 +13,7 @@ import pyarrow as pa
 import numpy as np
 from models.memory_entry import MemoryEntry
 from utils.embedding import EmbeddingModel
-import config
+from config import CFG
 import os
 
 
@@ -28,13 +28,13 @@ class VectorStore:
     3. Symbolic Layer: Structured metadata for deterministic filtering
     """
     def __init__(self, db_path: str = None, embedding_model: EmbeddingModel = None, table_name: str = None):
-        self.db_path = db_path or config.LANCEDB_PATH
-        self.embedding_model = embedding_model or EmbeddingModel()
+        self.db_path = db_path or CFG.LANCEDB_PATH
+        self.embedding_model = embedding_model or EmbeddingModel(cache_dir=self.db_path)
 
         # Connect to database
         os.makedirs(self.db_path, exist_ok=True)
         self.db = lancedb.connect(self.db_path)
-        self.table_name = table_name or config.MEMORY_TABLE_NAME
+        self.table_name = table_name or CFG.MEMORY_TABLE_NAME
         self.table = None
 
         self._init_table()
@@ -63,6 +63,11 @@ class VectorStore:
         else:
             self.table = self.db.open_table(self.table_name)
             print(f"Opened existing table: {self.table_name}")
+            stored_dim = self.table.schema.field("vector").type.list_size
+            if stored_dim != self.embedding_model.dimension:
+                print(f"Warning: table vectors have {stored_dim} dims but the embedding model "
+                      f"produces {self.embedding_model.dimension}; re-index after changing "
+                      f"EMBEDDING_MODEL or EMBEDDING_OUT_DIM")
 
     def add_entries(self, entries: List[MemoryEntry]):
         """
@@ -72,24 +77,24 @@ class VectorStore:
             return
 
         # Generate vectors (encode documents without query prompt)
+        # Table stores float32, so request that dtype directly (values carry float16
+        # precision while the embedding cache is enabled)
         restatements = [entry.lossless_restatement for entry in entries]
-        vectors = self.embedding_model.encode_documents(restatements)
-
-        # Build data
-        data = []
-        for entry, vector in zip(entries, vectors):
-            v_list = vector.tolist() if hasattr(vector, "tolist") else vector
-            data.append({
-                "entry_id": entry.entry_id,
-                "lossless_restatement": entry.lossless_restatement,
-                "keywords": entry.keywords,
-                "timestamp": entry.timestamp or "",
-                "location": entry.location or "",
-                "persons": entry.persons,
-                "entities": entry.entities,
-                "topic": entry.topic or "",
-                "vector": v_list
-            })
+        vectors = self.embedding_model.encode_documents(restatements, dtype=np.float32)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        # Build data as an Arrow table; the vector column wraps the matrix buffer
+        data = pa.Table.from_pydict({
+            "entry_id": [entry.entry_id for entry in entries],
+            "lossless_restatement": restatements,
+            "keywords": [entry.keywords for entry in entries],
+            "timestamp": [entry.timestamp or "" for entry in entries],
+            "location": [entry.location or "" for entry in entries],
+            "persons": [entry.persons for entry in entries],
+            "entities": [entry.entities for entry in entries],
+            "topic": [entry.topic or "" for entry in entries],
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), vectors.shape[1])
+        }, schema=self.table.schema)
 
         # Add to table
         self.table.add(data)
@@ -108,11 +113,10 @@ class VectorStore:
                 return []
 
             # Generate query vector (use query prompt optimization for Qwen3)
-            query_vector = self.embedding_model.encode_single(query, is_query=True)
-            v_list = query_vector.tolist() if hasattr(query_vector, "tolist") else query_vector
+            query_vector = self.embedding_model.encode_single(query, is_query=True, dtype=np.float32)
 
             # Execute vector search
-            results = self.table.search(v_list).limit(top_k).to_list()
+            results = self.table.search(query_vector).limit(top_k).to_list()
 
             # Convert to MemoryEntry objects
             entries = []
@@ -10,7 +10,7 @@ from database.vector_store import VectorStore
 from core.memory_builder import MemoryBuilder
 from core.hybrid_retriever import HybridRetriever
 from core.answer_generator import AnswerGenerator
-import config
+from config import CFG
 
 
 class SimpleMemSystem:
@@ -72,7 +72,7 @@ class SimpleMemSystem:
             enable_thinking=enable_thinking,
             use_streaming=use_streaming
         )
-        self.embedding_model = EmbeddingModel()
+        self.embedding_model = EmbeddingModel(api_key=api_key, cache_dir=db_path)
         self.vector_store = VectorStore(
             db_path=db_path,
             embedding_model=self.embedding_model,
@@ -1,15 +1,25 @@
 import argparse
 import os
-import sys
 from datetime import datetime
 
-# Add current dir to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import CFG
 
-# Monkey patch config before importing main
-import config
+# SimpleMemSystem (and with it LiteLLM) is imported lazily inside the actions
+# that need it, so --help and clear don't pay the heavy import cost
+
+
+def clear_memory():
+    """
+    Drop the memory table without loading the LLM or embedding clients
+    """
+    import lancedb
+
+    if not os.path.isdir(CFG.LANCEDB_PATH):
+        return
+    db = lancedb.connect(CFG.LANCEDB_PATH)
+    if CFG.MEMORY_TABLE_NAME in db.table_names():
+        db.drop_table(CFG.MEMORY_TABLE_NAME)
 
-from main import SimpleMemSystem
 
 def main():
     parser = argparse.ArgumentParser(description="SimpleMem CLI for Gemini")
@@ -20,24 +30,28 @@ def main():
     
     args = parser.parse_args()
 
-    # Set API Key
-    if args.api_key:
-        config.OPENAI_API_KEY = args.api_key
-        os.environ["GEMINI_API_KEY"] = args.api_key
-        os.environ["GOOGLE_API_KEY"] = args.api_key
-        os.environ["OPENAI_API_KEY"] = args.api_key 
-    
+    # Set API Key (CFG is read-only, so the key is passed to the system explicitly)
+    api_key = args.api_key or CFG.OPENAI_API_KEY
+
     # Ensure environment variables are set for litellm
-    if config.OPENAI_API_KEY:
-        os.environ["GEMINI_API_KEY"] = config.OPENAI_API_KEY
-        os.environ["GOOGLE_API_KEY"] = config.OPENAI_API_KEY
-        os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY
+    if api_key:
+        os.environ["GEMINI_API_KEY"] = api_key
+        os.environ["GOOGLE_API_KEY"] = api_key
+        os.environ["OPENAI_API_KEY"] = api_key
+
+    if args.action == "clear":
+        try:
+            clear_memory()
+        except Exception as e:
+            print(f"Error clearing memory: {e}")
+            return
+        print("✅ Memory cleared.")
+        return
 
     # Initialize System
-    clear_db = (args.action == "clear")
-    
     try:
-        system = SimpleMemSystem(clear_db=clear_db)
+        from main import SimpleMemSystem
+        system = SimpleMemSystem(api_key=api_key)
     except Exception as e:
         print(f"Error initializing system: {e}")
         return
@@ -67,8 +81,5 @@ def main():
         except Exception as e:
             print(f"Error during query: {e}")
 
-    elif args.action == "clear":
-        print("✅ Memory cleared.")
-
 if __name__ == "__main__":
     main()
@@ -2,73 +2,441 @@
 Embedding utilities - Generate vector embeddings using LiteLLM
 Refactored to support API-based embeddings (Gemini, OpenAI) via LiteLLM
 """
-from typing import List, Union, Optional
-from litellm import embedding
-import config
+import asyncio
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Union, Optional
+import numpy as np
+from litellm import embedding, token_counter, UnsupportedParamsError
+from config import CFG
+
+# SQLite caps the number of bound parameters per statement
+_CACHE_LOOKUP_CHUNK = 500
+
+# Seconds to wait on a locked cache before treating it as unavailable
+_CACHE_TIMEOUT = 0.5
+
+# Known output dimensions, keyed by lowercased model name without the LiteLLM
+# provider prefix; anything else uses EMBEDDING_DIMENSION from config
+_DIM_TABLE = {
+    "text-embedding-004": 768,
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "qwen3-embedding-0.6b": 1024,
+    "qwen3-0.6b": 1024,
+}
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a float32 matrix in place
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class _PendingBatch:
+    """
+    Coalesces concurrent single-text requests into shared embedding calls.
+    A background thread waits up to `window` seconds after the first request
+    for more to arrive (at most `max_size`), then encodes them together.
+    """
+    _STOP = object()
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], window: float = 0.01, max_size: int = 64):
+        self._encode = encode
+        self._window = window
+        self._max_size = max_size
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("embedding batcher is closed"))
+        else:
+            self._queue.put((text, future))
+        return future
+
+    def close(self):
+        """Stop the worker thread; requests already queued are still served."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            pending = [item]
+            deadline = time.monotonic() + self._window
+            while len(pending) < self._max_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                pending.append(item)
+
+            try:
+                vectors = self._encode([text for text, _ in pending])
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(pending, vectors):
+                future.set_result(vector)
+
 
 class EmbeddingModel:
     """
     Embedding model using LiteLLM (supports Gemini, OpenAI, etc.)
     """
-    def __init__(self, model_name: str = None):
-        self.model_name = model_name or config.EMBEDDING_MODEL
-        self.api_key = config.OPENAI_API_KEY
+    def __init__(
+        self,
+        model_name: str = None,
+        api_key: Optional[str] = None,
+        output_dimension: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ):
+        """
+        Args:
+        - output_dimension: Matryoshka truncation width (None=use config
+          EMBEDDING_OUT_DIM, which defaults to the model's native size)
+        - cache_dir: Directory holding the embedding cache, normally the
+          database path (None=use config LANCEDB_PATH)
+        """
+        self.model_name = model_name or CFG.EMBEDDING_MODEL
+        self.api_key = api_key or CFG.OPENAI_API_KEY
+        self.batch_size = CFG.EMBEDDING_BATCH_SIZE
+        self.max_concurrency = CFG.MAX_PARALLEL_WORKERS
+        self.context_length = CFG.EMBEDDING_CONTEXT_LENGTH
+        self.max_batch_tokens = CFG.EMBEDDING_MAX_BATCH_TOKENS
+        # Sub-batches run on one long-lived pool (created on first use) so
+        # LiteLLM's HTTP client and its connections are reused across calls
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        self._cache_write_warned = False
+        # encode_single coalescing: only engaged while calls overlap
+        self._batcher = None
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        if CFG.ENABLE_EMBEDDING_CACHE:
+            self._init_cache(os.path.join(cache_dir or CFG.LANCEDB_PATH, "embed_cache"))
         
         print(f"Loading embedding model: {self.model_name}")
         
-        # Determine dimension based on known models to avoid initial API call costs/latency
-        if "text-embedding-004" in self.model_name:
-            self.dimension = 768
-        elif "ada-002" in self.model_name or "3-small" in self.model_name:
-            self.dimension = 1536
-        elif "qwen" in self.model_name.lower():
-             self.dimension = 1024 # Default for Qwen3-0.6B as per original config
+        # Determine dimension from the static table (no API call at startup)
+        base_name = self.model_name.rsplit("/", 1)[-1].lower()
+        self.dimension = _DIM_TABLE.get(base_name, CFG.EMBEDDING_DIMENSION)
+
+        # Matryoshka truncation: keep the leading dims and L2-renormalize.
+        # Changing this changes the stored vector width, so it needs a full re-index.
+        self.output_dimension = output_dimension or CFG.EMBEDDING_OUT_DIM
+        if self.output_dimension and self.output_dimension < self.dimension:
+            print(f"Truncating embeddings to {self.output_dimension} dims (Matryoshka)")
+            self.dimension = self.output_dimension
         else:
-            # Fallback: make a dummy call to check dimension
+            self.output_dimension = None
+        # Ask the provider for the reduced size until it reports it can't
+        self._send_dimensions = True
+
+    def _init_cache(self, path: str):
+        """
+        Open the content-addressed embedding cache (SQLite, WAL mode)
+        """
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, timeout=_CACHE_TIMEOUT, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, vec BLOB)")
+            self._cache = conn
+        except Exception as e:
+            print(f"Warning: embedding cache disabled: {e}")
+            self._cache = None
+
+    def _cache_key(self, text: str) -> bytes:
+        model = self.model_name
+        if self.output_dimension:
+            model = f"{model}@{self.output_dimension}"
+        return hashlib.blake2b(f"{model}|{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _cache_get(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up cached vectors; returns only the hits.
+        Cache errors are treated as misses, so they never fail a request.
+        """
+        if self._cache is None or not keys:
+            return {}
+        hits = {}
+        unique_keys = list(dict.fromkeys(keys))
+        try:
+            with self._cache_lock:
+                for i in range(0, len(unique_keys), _CACHE_LOOKUP_CHUNK):
+                    chunk = unique_keys[i:i + _CACHE_LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._cache.execute(
+                        f"SELECT key, vec FROM cache WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, vec in rows:
+                        hits[key] = np.frombuffer(vec, dtype=np.float16).astype(np.float32)
+        except sqlite3.Error as e:
+            print(f"Warning: embedding cache read failed, embedding all texts: {e}")
+            return {}
+        return hits
+
+    def _cache_put(self, items: List[tuple]):
+        """
+        Store (key, vector) pairs as float16 blobs
+        """
+        if self._cache is None or not items:
+            return
+        rows = [(key, vec.astype(np.float16).tobytes()) for key, vec in items]
+        try:
+            with self._cache_lock:
+                self._cache.executemany("INSERT OR IGNORE INTO cache (key, vec) VALUES (?, ?)", rows)
+        except sqlite3.Error as e:
+            # The embeddings were already fetched; losing the write only costs a future miss
+            if not self._cache_write_warned:
+                print(f"Warning: embedding cache write failed (further failures not reported): {e}")
+                self._cache_write_warned = True
+
+    def encode_documents(
+        self,
+        texts: List[str],
+        dtype: np.dtype = np.float16,
+        normalize: bool = False
+    ) -> np.ndarray:
+        """
+        Encode a list of texts into an (n, dimension) embedding matrix,
+        dispatching sub-batches concurrently on the model's worker pool.
+        Texts already in the on-disk cache are not sent to the provider.
+        The cache stores float16, so while it is enabled every vector (cached
+        or fresh) carries float16 precision and repeated calls return
+        identical values.
+
+        Args:
+            dtype: Output dtype (float16 by default, pass np.float32 to opt out)
+            normalize: L2-normalize each row
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=dtype)
+
+        keys = [self._cache_key(text) for text in texts]
+        vectors = self._cache_get(keys)
+
+        # Deduplicate misses so repeated texts are embedded once
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                misses.setdefault(key, text)
+
+        if misses:
+            miss_keys = list(misses.keys())
+            miss_texts = list(misses.values())
+            slices = self._pack_batches(miss_texts)
+
             try:
-                print("Detecting embedding dimension...")
-                dummy = self.encode_single("test")
-                self.dimension = len(dummy)
-                print(f"Detected dimension: {self.dimension}")
+                if len(slices) == 1:
+                    results = [self._encode_batch(slices[0])]
+                else:
+                    # map preserves slice order, so stacking keeps input order
+                    results = list(self._pool().map(self._encode_batch, slices))
             except Exception as e:
-                print(f"Error detecting dimension: {e}")
-                self.dimension = 768 # Fallback default
-                
-    def encode_documents(self, texts: List[str]) -> List[List[float]]:
+                print(f"Embedding error: {e}")
+                raise e
+
+            fresh = np.concatenate(results)
+            if self._cache is not None:
+                # Match the precision of cache hits so results don't depend on hit/miss
+                fresh = fresh.astype(np.float16).astype(np.float32)
+            vectors.update(zip(miss_keys, fresh))
+            self._cache_put(list(zip(miss_keys, fresh)))
+
+        out = np.empty((len(texts), len(vectors[keys[0]])), dtype=np.float32)
+        for i, key in enumerate(keys):
+            out[i] = vectors[key]
+
+        if normalize:
+            _l2_normalize(out)
+
+        return out.astype(dtype, copy=False)
+
+    async def encode_documents_async(
+        self,
+        texts: List[str],
+        dtype: np.dtype = np.float16,
+        normalize: bool = False
+    ) -> np.ndarray:
         """
-        Encode a list of texts into embeddings
+        Awaitable encode_documents for callers running an event loop
+        (the blocking work runs in a thread, not on the caller's loop)
         """
-        if not texts:
-            return []
-            
+        return await asyncio.to_thread(self.encode_documents, texts, dtype, normalize)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self.max_concurrency),
+                    thread_name_prefix="embedding"
+                )
+            return self._executor
+
+    def _count_tokens(self, text: str) -> int:
         try:
-            # LiteLLM handles batching logic for many providers, 
-            # but standard embedding calls take a list.
-            response = embedding(
-                model=self.model_name,
-                input=texts,
-                api_key=self.api_key
-            )
-            # Ensure correct order
-            data = response['data']
-            if hasattr(data, 'sort'): # generic response object might be dict or object
-                 data.sort(key=lambda x: x['index'])
-            elif isinstance(data, list):
-                 data = sorted(data, key=lambda x: x['index'])
-                 
-            return [item['embedding'] for item in data]
-        except Exception as e:
-            print(f"Embedding error: {e}")
-            raise e
+            return token_counter(model=self.model_name, text=text)
+        except Exception:
+            # Rough estimate when no tokenizer is available for the model
+            return len(text) // 4 + 1
+
+    def _pack_batches(self, texts: List[str]) -> List[List[str]]:
+        """
+        Greedily pack texts (in order) into batches capped by EMBEDDING_BATCH_SIZE
+        texts and EMBEDDING_MAX_BATCH_TOKENS tokens. Texts longer than
+        EMBEDDING_CONTEXT_LENGTH are truncated so they cannot fail a whole batch.
+        """
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = self._count_tokens(text)
+            if tokens > self.context_length:
+                # Cut proportionally by characters, with a small safety margin
+                keep = int(len(text) * self.context_length / tokens * 0.95)
+                print(f"Warning: embedding input has {tokens} tokens "
+                      f"(limit {self.context_length}), truncating")
+                text = text[:keep]
+                tokens = self.context_length
+
+            if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed one sub-batch
+        """
+        kwargs = {
+            "model": self.model_name,
+            "input": texts,
+            "api_key": self.api_key,
+        }
+        if self.output_dimension and self._send_dimensions:
+            kwargs["dimensions"] = self.output_dimension
 
-    def encode_single(self, text: str, is_query: bool = False) -> List[float]:
+        try:
+            response = embedding(**kwargs)
+        except UnsupportedParamsError:
+            if "dimensions" not in kwargs:
+                raise
+            # Provider can't shorten server-side; truncate client-side instead
+            self._send_dimensions = False
+            kwargs.pop("dimensions")
+            response = embedding(**kwargs)
+        data = response['data']
+        indices = [item['index'] for item in data]
+        # Providers normally return items in order; only reorder when they don't
+        if any(indices[i] > indices[i + 1] for i in range(len(indices) - 1)):
+            order = np.argsort(np.asarray(indices, dtype=np.int64), kind='stable')
+            data = [data[i] for i in order]
+        out = np.asarray([item['embedding'] for item in data], dtype=np.float32)
+
+        if self.output_dimension:
+            out = _l2_normalize(np.ascontiguousarray(out[:, :self.output_dimension]))
+        return out
+
+    def encode_single(
+        self,
+        text: str,
+        is_query: bool = False,
+        dtype: np.dtype = np.float16,
+        normalize: bool = False
+    ) -> np.ndarray:
         """
-        Encode a single text
+        Encode a single text. Calls that overlap (e.g. parallel retrieval
+        workers) are coalesced into one embedding request; a lone caller
+        is sent directly so it doesn't wait on the batching window. The
+        caller that opens an overlap has already been sent by then, so
+        shared requests start with the second concurrent caller and
+        include every caller that arrives while it is still in flight.
         """
-        embeddings = self.encode_documents([text])
-        if not embeddings:
-            raise ValueError("Failed to generate embedding")
-        return embeddings[0]
+        with self._inflight_lock:
+            self._inflight += 1
+            coalesce = self._inflight > 1
+            if coalesce and self._batcher is None:
+                # Bind weakly so the worker thread doesn't keep the model alive
+                model_ref = weakref.ref(self)
+
+                def _encode(texts: List[str]) -> np.ndarray:
+                    model = model_ref()
+                    if model is None:
+                        raise RuntimeError("EmbeddingModel was garbage collected")
+                    return model.encode_documents(texts, dtype=np.float32)
+
+                self._batcher = _PendingBatch(_encode, max_size=self.batch_size)
+                weakref.finalize(self, self._batcher.close)
+            # close() may clear self._batcher once the lock is released
+            batcher = self._batcher if coalesce else None
+
+        try:
+            if batcher is not None:
+                # No timeout of its own, same as the direct path below
+                vector = batcher.submit(text).result()
+            else:
+                vector = self.encode_documents([text], dtype=np.float32)[0]
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+
+        vector = vector.reshape(1, -1)
+        if normalize:
+            vector = _l2_normalize(vector.copy())
+        return vector[0].astype(dtype, copy=False)
         
+    def close(self):
+        """Stop the worker threads and close the embedding cache."""
+        with self._inflight_lock:
+            batcher, self._batcher = self._batcher, None
+        if batcher is not None:
+            batcher.close()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+
     def get_sentence_embedding_dimension(self) -> int:
-        return self.dimension
\ No newline at end of file
+        return self.dimension
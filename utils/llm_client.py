@@ -2,11 +2,258 @@
 LLM Client - Handles all LLM interactions
 Refactored to use LiteLLM for broad model support (Gemini, OpenAI, etc.)
 """
+import asyncio
+import functools
 import json
-from typing import List, Dict, Any, Optional
-from litellm import completion
-import config
+import random
+import re
+import sys
 import time
+from typing import Callable, List, Dict, Any, Optional
+from litellm import acompletion, completion, RateLimitError
+from config import CFG
+
+# Optional orjson speedup for plain parses. orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so callers only catch the stdlib type. orjson rejects
+# NaN/Infinity, so cleaned or lenient parses stay on the stdlib decoder; it
+# also turns integers wider than 64 bits into floats, so _loads sends any
+# input with a 19+ digit run to the stdlib decoder to keep them exact.
+try:
+    from orjson import loads as _orjson_loads
+except ImportError:
+    _orjson_loads = json.loads
+
+_WIDE_INT = re.compile(r'\d{19,}')
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Common LLM preambles before the JSON payload, matched case-insensitively
+# at the start of the response (no lowercased copy of the text is needed)
+_JSON_PREFIX = re.compile(
+    r"(?:Here's the JSON:|Here is the JSON:|The JSON is:|JSON:|Result:|Output:|Answer:)\s*",
+    re.IGNORECASE
+)
+
+# Opening marker of a ```json fenced block
+_JSON_FENCE = re.compile(r'```json', re.IGNORECASE)
+
+# Upper bound for exponential retry backoff
+_MAX_BACKOFF = 30  # seconds
+
+# Streamed tokens are echoed to stdout in batches rather than one write per chunk
+_STREAM_FLUSH_INTERVAL = 0.05  # seconds
+_STREAM_FLUSH_CHUNKS = 16
+
+# Block comments, line comments and trailing commas (a comma followed only by
+# whitespace/comments before a closing bracket) are all dropped in one pass
+_JSON_NOISE = re.compile(
+    r'/\*.*?\*/'
+    r'|//[^\n]*'
+    r'|,(?=(?:\s|//[^\n]*|/\*.*?\*/)*[}\]])',
+    re.DOTALL
+)
+
+
+class _StdoutEcho:
+    """
+    Live stdout rendering for streamed tokens, used as the default on_token
+    callback. Tokens are written in batches rather than one write per chunk.
+    """
+    def __init__(self):
+        self._pending = []
+        self._last_flush = time.monotonic()
+        sys.stdout.write('\n')  # Newline before stream
+
+    def __call__(self, token: str):
+        self._pending.append(token)
+        now = time.monotonic()
+        if len(self._pending) >= _STREAM_FLUSH_CHUNKS or now - self._last_flush >= _STREAM_FLUSH_INTERVAL:
+            self._flush(now)
+
+    def _flush(self, now: float):
+        sys.stdout.write(''.join(self._pending))
+        sys.stdout.flush()
+        self._pending.clear()
+        self._last_flush = now
+
+    def close(self):
+        self._pending.append('\n')
+        self._flush(time.monotonic())
+
+
+def _loads(text: str) -> Any:
+    if _WIDE_INT.search(text):
+        return json.loads(text)
+    return _orjson_loads(text)
+
+
+def _discard_token(token: str):
+    """on_token sink for callers that only want the collected text"""
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read Retry-After from a rate-limit error. LiteLLM's exception mapping
+    usually puts the upstream headers on `litellm_response_headers` (the
+    `response` it attaches may be synthetic), so check that first.
+    """
+    sources = (
+        getattr(error, 'litellm_response_headers', None),
+        getattr(error, 'headers', None),
+        getattr(getattr(error, 'response', None), 'headers', None),
+    )
+    for headers in sources:
+        if not headers:
+            continue
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before the next attempt: the server's Retry-After on rate
+    limits (clamped, plus a little jitter), otherwise full-jitter exponential
+    backoff so concurrent workers don't retry in lockstep
+    """
+    if isinstance(error, RateLimitError):
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, _MAX_BACKOFF * 4) + random.uniform(0, 1)
+    return random.uniform(0, min(2 ** attempt, _MAX_BACKOFF))
+
+
+def _report_failure(error: Exception, attempt: int, max_retries: int) -> Optional[float]:
+    """
+    Log a failed LLM call; returns seconds to wait before retrying, or None
+    when no attempts are left
+    """
+    if attempt < max_retries - 1:
+        wait_time = _retry_delay(error, attempt)
+        print(f"LLM API call failed (attempt {attempt + 1}/{max_retries}): {error}")
+        print(f"Retrying in {wait_time:.1f} seconds...")
+        return wait_time
+    print(f"LLM API call failed after {max_retries} attempts: {error}")
+    return None
+
+
+def _chunk_text(chunk) -> Optional[str]:
+    """Text delta of a streamed completion chunk, if any"""
+    choices = chunk.choices
+    if choices:
+        return choices[0].delta.content
+    return None
+
+
+@functools.lru_cache(maxsize=512)
+def _extract_json_cached(text: str) -> str:
+    """
+    Memoized _extract_json. The result is cached re-serialized so every hit
+    returns a fresh object (re-parsing is much cheaper than deepcopy)
+    """
+    return json.dumps(_extract_json(text))
+
+
+def _extract_json(text: str) -> Any:
+    """
+    Extract JSON from LLM response with robust parsing
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty response received")
+
+    text = text.strip()
+
+    # Remove common LLM prefixes/suffixes
+    prefix = _JSON_PREFIX.match(text)
+    if prefix:
+        text = text[prefix.end():]
+
+    # Try direct parsing first
+    try:
+        return _loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Try extracting JSON from ```json ... ``` block
+    fence = _JSON_FENCE.search(text)
+    if fence:
+        start = fence.end()
+        end = text.find("```", start)
+        if end != -1:
+            json_str = text[start:end].strip()
+            try:
+                return _loads(json_str)
+            except json.JSONDecodeError:
+                json_str = _clean_json_string(json_str)
+                try:
+                    return json.loads(json_str)
+                except json.JSONDecodeError:
+                    pass
+
+    # Try extracting from generic ``` ... ``` code block
+    if "```" in text:
+        start = text.find("```") + 3
+        newline = text.find("\n", start)
+        if newline != -1 and newline - start < 20:
+            start = newline + 1
+        end = text.find("```", start)
+        if end != -1:
+            json_str = text[start:end].strip()
+            try:
+                return _loads(json_str)
+            except json.JSONDecodeError:
+                json_str = _clean_json_string(json_str)
+                try:
+                    return json.loads(json_str)
+                except json.JSONDecodeError:
+                    pass
+
+    # Try finding balanced JSON object/array
+    for start_char in ['{', '[']:
+        result = _extract_balanced_json(text, start_char)
+        if result is not None:
+            return result
+
+    # Last resort: try to find any JSON-like structure
+    for start_char in ['{', '[']:
+        start_idx = text.find(start_char)
+        if start_idx != -1:
+            chunk = text[start_idx:]
+            cleaned = _clean_json_string(chunk)
+            try:
+                obj, _ = _JSON_DECODER.raw_decode(cleaned)
+                return obj
+            except json.JSONDecodeError:
+                pass
+
+    raise ValueError(f"Failed to extract valid JSON from response. First 300 chars: {text[:300]}...")
+
+
+def _clean_json_string(json_str: str) -> str:
+    """
+    Clean common issues in JSON strings from LLM output
+    """
+    return _JSON_NOISE.sub('', json_str).strip()
+
+
+def _extract_balanced_json(text: str, start_char: str) -> Any:
+    """
+    Extract a balanced JSON object or array starting with start_char
+    (raw_decode parses up to the matching bracket and ignores trailing text)
+    """
+    start_idx = text.find(start_char)
+
+    if start_idx == -1:
+        return None
+
+    try:
+        obj, _ = _JSON_DECODER.raw_decode(text, start_idx)
+        return obj
+    except json.JSONDecodeError:
+        return None
 
 
 class LLMClient:
@@ -19,13 +266,16 @@ class LLMClient:
         model: Optional[str] = None,
         base_url: Optional[str] = None,
         enable_thinking: Optional[bool] = None,
-        use_streaming: Optional[bool] = None
+        use_streaming: Optional[bool] = None,
+        echo_stream: bool = True
     ):
-        self.api_key = api_key or config.OPENAI_API_KEY
-        self.model = model or config.LLM_MODEL
-        self.base_url = base_url or config.OPENAI_BASE_URL
-        self.enable_thinking = enable_thinking if enable_thinking is not None else config.ENABLE_THINKING
-        self.use_streaming = use_streaming if use_streaming is not None else config.USE_STREAMING
+        self.api_key = api_key or CFG.OPENAI_API_KEY
+        self.model = model or CFG.LLM_MODEL
+        self.base_url = base_url or CFG.OPENAI_BASE_URL
+        self.enable_thinking = enable_thinking if enable_thinking is not None else CFG.ENABLE_THINKING
+        self.use_streaming = use_streaming if use_streaming is not None else CFG.USE_STREAMING
+        # Render streamed tokens to stdout when no on_token callback is given
+        self.echo_stream = echo_stream
         
         print(f"LLMClient initialized with model: {self.model}")
 
@@ -34,23 +284,18 @@ class LLMClient:
         messages: List[Dict[str, str]],
         temperature: float = 0.2,
         response_format: Optional[Dict[str, str]] = None,
-        max_retries: int = 3
+        max_retries: int = 3,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> str:
         """
         Standard chat completion with optional thinking mode and retry mechanism
-        """
-        kwargs = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature,
-            "api_key": self.api_key,
-        }
 
-        if self.base_url:
-            kwargs["base_url"] = self.base_url
-
-        if response_format:
-            kwargs["response_format"] = response_format
+        Args:
+        - on_token: Called with each streamed token (streaming mode only).
+          Defaults to stdout rendering when echo_stream is enabled, otherwise
+          tokens are only collected
+        """
+        kwargs = self._completion_kwargs(messages, temperature, response_format)
 
         # Retry mechanism
         last_exception = None
@@ -59,179 +304,170 @@ class LLMClient:
                 # Use streaming if configured
                 if self.use_streaming:
                     kwargs["stream"] = True
-                    return self._handle_streaming_response(**kwargs)
+                    return self._handle_streaming_response(on_token, **kwargs)
                 else:
                     response = completion(**kwargs)
                     return response.choices[0].message.content
-                    
+
             except Exception as e:
                 last_exception = e
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
-                    print(f"LLM API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-                    print(f"Retrying in {wait_time} seconds...")
+                wait_time = _report_failure(e, attempt, max_retries)
+                if wait_time is not None:
                     time.sleep(wait_time)
-                else:
-                    print(f"LLM API call failed after {max_retries} attempts: {e}")
-        
+
         # If all retries failed, raise the last exception
         raise last_exception
 
-    def _handle_streaming_response(self, **kwargs) -> str:
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.2,
+        response_format: Optional[Dict[str, str]] = None,
+        max_retries: int = 3,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
         """
-        Handle streaming response and collect full content
+        Async counterpart of chat_completion, for callers already running
+        an event loop
         """
-        full_content = []
-        stream = completion(**kwargs)
+        kwargs = self._completion_kwargs(messages, temperature, response_format)
 
-        print() # Newline before stream
-        for chunk in stream:
-            if len(chunk.choices) > 0 and chunk.choices[0].delta.content is not None:
-                content = chunk.choices[0].delta.content
-                full_content.append(content)
-                print(content, end='', flush=True)
-        print()
-        return ''.join(full_content)
+        last_exception = None
+        for attempt in range(max_retries):
+            try:
+                if self.use_streaming:
+                    kwargs["stream"] = True
+                    return await self._ahandle_streaming_response(on_token, **kwargs)
+                else:
+                    response = await acompletion(**kwargs)
+                    return response.choices[0].message.content
 
-    def extract_json(self, text: str) -> Any:
+            except Exception as e:
+                last_exception = e
+                wait_time = _report_failure(e, attempt, max_retries)
+                if wait_time is not None:
+                    await asyncio.sleep(wait_time)
+
+        raise last_exception
+
+    async def batch_chat(
+        self,
+        messages_list: List[List[Dict[str, str]]],
+        temperature: float = 0.2,
+        response_format: Optional[Dict[str, str]] = None,
+        max_retries: int = 3,
+        max_concurrency: Optional[int] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> List[str]:
         """
-        Extract JSON from LLM response with robust parsing
+        Run several chat completions concurrently, bounded by a semaphore
+        (defaults to MAX_PARALLEL_WORKERS); results keep the input order.
+        Streamed tokens are not echoed unless on_token is given, since
+        concurrent streams would interleave on stdout
         """
-        if not text or not text.strip():
-            raise ValueError("Empty response received")
-
-        text = text.strip()
-
-        # Remove common LLM prefixes/suffixes
-        common_prefixes = [
-            "Here's the JSON:",
-            "Here is the JSON:",
-            "The JSON is:",
-            "JSON:",
-            "Result:",
-            "Output:",
-            "Answer:",
-        ]
-        for prefix in common_prefixes:
-            if text.lower().startswith(prefix.lower()):
-                text = text[len(prefix):].strip()
-
-        # Try direct parsing first
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-        # Try extracting JSON from ```json ... ``` block
-        if "```json" in text.lower():
-            start_marker = "```json"
-            start_idx = text.lower().find(start_marker)
-            if start_idx != -1:
-                start = start_idx + len(start_marker)
-                end = text.find("```", start)
-                if end != -1:
-                    json_str = text[start:end].strip()
-                    try:
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        json_str = self._clean_json_string(json_str)
-                        try:
-                            return json.loads(json_str)
-                        except json.JSONDecodeError:
-                            pass
-
-        # Try extracting from generic ``` ... ``` code block
-        if "```" in text:
-            start = text.find("```") + 3
-            newline = text.find("\n", start)
-            if newline != -1 and newline - start < 20:
-                start = newline + 1
-            end = text.find("```", start)
-            if end != -1:
-                json_str = text[start:end].strip()
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    json_str = self._clean_json_string(json_str)
-                    try:
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        pass
-
-        # Try finding balanced JSON object/array
-        for start_char in ['{', '[']:
-            result = self._extract_balanced_json(text, start_char)
-            if result is not None:
-                return result
-
-        # Last resort: try to find any JSON-like structure
-        for start_char in ['{', '[']:
-            start_idx = text.find(start_char)
-            if start_idx != -1:
-                chunk = text[start_idx:]
-                cleaned = self._clean_json_string(chunk)
-                try:
-                    return json.loads(cleaned)
-                except json.JSONDecodeError:
-                    pass
+        if on_token is None:
+            on_token = _discard_token
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or CFG.MAX_PARALLEL_WORKERS))
+
+        async def _bounded(messages: List[Dict[str, str]]) -> str:
+            async with semaphore:
+                return await self.achat_completion(
+                    messages,
+                    temperature=temperature,
+                    response_format=response_format,
+                    max_retries=max_retries,
+                    on_token=on_token
+                )
+
+        return await asyncio.gather(*[_bounded(messages) for messages in messages_list])
+
+    def _completion_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        response_format: Optional[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "api_key": self.api_key,
+        }
+
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+
+        if response_format:
+            kwargs["response_format"] = response_format
+
+        return kwargs
 
-        raise ValueError(f"Failed to extract valid JSON from response. First 300 chars: {text[:300]}...")
+    def _stream_echo(self, on_token: Optional[Callable[[str], None]]) -> Optional[_StdoutEcho]:
+        """Default stdout renderer, created only when no on_token is given"""
+        if on_token is None and self.echo_stream:
+            return _StdoutEcho()
+        return None
 
-    def _clean_json_string(self, json_str: str) -> str:
+    def _handle_streaming_response(
+        self,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> str:
         """
-        Clean common issues in JSON strings from LLM output
+        Handle streaming response and collect full content.
+        Rendering is delegated to on_token so the receive loop only collects.
         """
-        import re
-        json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-        json_str = re.sub(r'//.*?$', '', json_str, flags=re.MULTILINE)
-        json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
-        return json_str.strip()
+        stream = completion(**kwargs)
+        echo = self._stream_echo(on_token)
+        if echo is not None:
+            on_token = echo
+
+        full_content = []
+        append = full_content.append
+        try:
+            for chunk in stream:
+                if content := _chunk_text(chunk):
+                    append(content)
+                    if on_token is not None:
+                        on_token(content)
+        finally:
+            if echo is not None:
+                echo.close()
+        return ''.join(full_content)
 
-    def _extract_balanced_json(self, text: str, start_char: str) -> Any:
+    async def _ahandle_streaming_response(
+        self,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> str:
         """
-        Extract a balanced JSON object or array starting with start_char
+        Async counterpart of _handle_streaming_response
         """
-        end_char = '}' if start_char == '{' else ']'
-        start_idx = text.find(start_char)
+        stream = await acompletion(**kwargs)
+        echo = self._stream_echo(on_token)
+        if echo is not None:
+            on_token = echo
 
-        if start_idx == -1:
-            return None
-
-        depth = 0
-        in_string = False
-        escape_next = False
-
-        for i in range(start_idx, len(text)):
-            char = text[i]
-
-            if escape_next:
-                escape_next = False
-                continue
-
-            if char == '\\':
-                escape_next = True
-                continue
-
-            if char == '"':
-                in_string = not in_string
-                continue
-
-            if in_string:
-                continue
-
-            if char == start_char:
-                depth += 1
-            elif char == end_char:
-                depth -= 1
-                if depth == 0:
-                    json_str = text[start_idx:i+1]
-                    try:
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        cleaned = self._clean_json_string(json_str)
-                        try:
-                            return json.loads(json_str)
-                        except json.JSONDecodeError:
-                            break
-
-        return None
\ No newline at end of file
+        full_content = []
+        append = full_content.append
+        try:
+            async for chunk in stream:
+                if content := _chunk_text(chunk):
+                    append(content)
+                    if on_token is not None:
+                        on_token(content)
+        finally:
+            if echo is not None:
+                echo.close()
+        return ''.join(full_content)
+
+    def extract_json(self, text: str) -> Any:
+        """
+        Extract JSON from LLM response with robust parsing
+        (memoized per response text, so retry/reflection re-parses are cheap)
+        """
+        frozen = _extract_json_cached(text)
+        try:
+            return _loads(frozen)
+        except json.JSONDecodeError:  # NaN/Infinity survive json.dumps but not orjson
+            return json.loads(frozen)